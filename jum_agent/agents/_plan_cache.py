@@ -0,0 +1,125 @@
+'''Template cache for manager plans.
+
+Objectives handed to the `ManagerAgent` tend to recur with the same
+decomposition. This module stores plans that went on to pass QA so that a
+later, similar objective can reuse them without asking the LLM. A plan is
+only reused for the same (normalised) context and constraints; within that
+scope objectives are matched first by their normalised text and then, if
+sentence-transformers is installed, by cosine similarity of their
+embeddings. Entries live in a small SQLite database next to the response
+cache (LLM_CACHE_DIR) and, like it, are disabled by LLM_CACHE=off. A plan
+that later fails QA should be removed with `delete`.
+
+The connection may be used from worker threads (callers on the event loop
+run `lookup` and `insert` through `asyncio.to_thread`, since computing an
+embedding can take a while); access to it is serialised with a lock.
+'''
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models.cache import DEFAULT_CACHE_DIR, cosine_similarity, embed
+
+PLAN_CACHE_FILE = 'plans.sqlite3'
+
+
+def normalise(text: str) -> str:
+    '''Lower-case text and collapse its whitespace.'''
+    return ' '.join(text.lower().split())
+
+
+def _scope(context: str, constraints: str) -> str:
+    return json.dumps([normalise(context), normalise(constraints)])
+
+
+class PlanCache:
+    '''SQLite-backed store of accepted task lists keyed by objective.'''
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.92) -> None:
+        self.path = Path(path) if path else DEFAULT_CACHE_DIR / PLAN_CACHE_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS plan_templates ('
+            'objective_norm TEXT NOT NULL, scope TEXT NOT NULL, embedding TEXT, '
+            'tasks_json TEXT NOT NULL, PRIMARY KEY (objective_norm, scope))'
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional['PlanCache']:
+        '''Build a cache under LLM_CACHE_DIR, or None if LLM_CACHE is off.'''
+        if os.environ.get('LLM_CACHE', 'off').strip().lower() == 'off':
+            return None
+        directory = os.environ.get('LLM_CACHE_DIR')
+        return cls(path=str(Path(directory) / PLAN_CACHE_FILE) if directory else None)
+
+    def lookup(
+        self, objective: str, context: str = '', constraints: str = ''
+    ) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        '''Find a cached plan for a similar objective in the same context/constraints.
+
+        :returns: A tuple `(matched_objective, tasks)`, where
+            `matched_objective` is the normalised objective the plan was
+            stored under (pass it to :meth:`delete`), or None on a miss.
+        '''
+        key = normalise(objective)
+        scope = _scope(context, constraints)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT tasks_json FROM plan_templates WHERE objective_norm = ? AND scope = ?', (key, scope)
+            ).fetchone()
+        if row is not None:
+            return key, json.loads(row[0])
+        embedding = embed(key)
+        if embedding is None:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT objective_norm, embedding, tasks_json FROM plan_templates '
+                'WHERE scope = ? AND embedding IS NOT NULL',
+                (scope,),
+            ).fetchall()
+        best, best_score = None, self.threshold
+        for objective_norm, embedding_json, tasks_json in rows:
+            score = cosine_similarity(embedding, json.loads(embedding_json))
+            if score >= best_score:
+                best, best_score = (objective_norm, tasks_json), score
+        return (best[0], json.loads(best[1])) if best else None
+
+    def insert(
+        self, objective: str, tasks: List[Dict[str, Any]], context: str = '', constraints: str = ''
+    ) -> None:
+        '''Remember `tasks` as an accepted plan for `objective`.'''
+        key = normalise(objective)
+        embedding = embed(key)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO plan_templates (objective_norm, scope, embedding, tasks_json) '
+                'VALUES (?, ?, ?, ?)',
+                (
+                    key,
+                    _scope(context, constraints),
+                    json.dumps(embedding) if embedding is not None else None,
+                    json.dumps(tasks),
+                ),
+            )
+
+    def delete(self, objective: str, context: str = '', constraints: str = '') -> None:
+        '''Remove the plan stored for `objective`, e.g. after it failed QA.'''
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM plan_templates WHERE objective_norm = ? AND scope = ?',
+                (normalise(objective), _scope(context, constraints)),
+            )
+
+    def close(self) -> None:
+        '''Close the database connection.'''
+        self._conn.close()
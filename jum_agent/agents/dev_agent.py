@@ -4,44 +4,85 @@ The `DevAgent` uses a language model to translate a high-level task plan into
 concrete code. In a production system you would craft detailed prompts
 describing your coding guidelines and the target language. For now, this
 agent uses a simple instruction and returns the response from the model.
+
+The response is streamed so that a refusal at the start of the reply can be
+detected and the generation aborted without waiting for the full answer; the
+refusal is reported to the caller as a `ModelRefusal`. Any other failure to
+get code from the model raises `CodeGenerationError`.
 '''
 
 from __future__ import annotations
 
-from typing import Any, Dict
+import re
+from typing import Any, Dict, List
 
 from ..models.llm_client import LLMClient
 
+# Openings that mean the model declined the task rather than writing code.
+_REFUSAL_RE = re.compile(
+    r"^\s*(I'm sorry|I am sorry|Sorry|I can(?:not|'t)|I'm unable|I am unable|As an AI)",
+    re.IGNORECASE,
+)
+# Number of leading characters inspected for a refusal.
+_REFUSAL_WINDOW = 200
+
+
+class CodeGenerationError(Exception):
+    '''Raised when the model gives no usable code for a task.'''
+
+
+class ModelRefusal(CodeGenerationError):
+    '''Raised when the model declines to write code for a task.'''
+
 
 class DevAgent:
     '''Agent that writes code based on a task and plan.'''
 
+    SYSTEM_PROMPT = (
+        'You are an expert software engineer. Using Python, write code that '
+        'accomplishes the task given by the user. You can assume you have access '
+        'to standard libraries. Provide only the code without backticks.'
+    )
+
     def __init__(self, llm_client: LLMClient) -> None:
         self.llm = llm_client
 
-    def generate_code(self, task: str, plan: Dict[str, Any]) -> str:
+    async def generate_code(self, task: str, plan: Dict[str, Any]) -> str:
         '''Generate code to satisfy the task.
 
         :param task: Original user task description.
         :param plan: High-level plan returned by the orchestrator’s planner.
         :returns: Code as a string.
+        :raises ModelRefusal: If the model declines the task.
+        :raises CodeGenerationError: If the request fails or the reply is empty.
         '''
         plan_summary = plan.get('summary', task)
-        steps = plan.get('steps', [])
-        instruction = (
-            'You are an expert software engineer. Using Python, write code that '
-            'accomplishes the following task: {task}. You can assume you have access '
-            'to standard libraries. Provide only the code without backticks.'
-        ).format(task=plan_summary)
         try:
-            response = self.llm.chat(instruction, temperature=0.1)
-        except Exception:
-            response = None
-        if not response:
-            # Fallback stub
-            return (
-                '# TODO: implement code for task\\n'
-                'def placeholder_function():\\n'
-                '    raise NotImplementedError("This function should be implemented by the DevAgent")'
-            )
+            response = await self._stream_code(plan_summary)
+        except ModelRefusal:
+            raise
+        except Exception as exc:
+            raise CodeGenerationError(f'LLM request failed: {exc}') from exc
+        if not response.strip():
+            raise CodeGenerationError('the model returned an empty reply')
         return response.strip()
+
+    def discard(self, task: str, plan: Dict[str, Any]) -> None:
+        '''Evict the cached reply for a task whose code was rejected.'''
+        self.llm.forget(plan.get('summary', task), temperature=0.1, system=self.SYSTEM_PROMPT)
+
+    async def _stream_code(self, prompt: str) -> str:
+        '''Stream the model's code, stopping early on a refusal.'''
+        stream = self.llm.astream(prompt, temperature=0.1, system=self.SYSTEM_PROMPT)
+        parts: List[str] = []
+        head = ''
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+                if len(head) < _REFUSAL_WINDOW:
+                    head += chunk
+                    if _REFUSAL_RE.match(head):
+                        raise ModelRefusal(head.strip())
+        finally:
+            await stream.aclose()
+        return ''.join(parts)
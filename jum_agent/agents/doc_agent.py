@@ -4,10 +4,15 @@ The `DocAgent` is responsible for generating human-readable documentation from
 the changes produced by the Dev and validated by QA. This includes
 updating READMEs, writing changelogs and crafting commit messages. It uses
 the language model to turn structured diffs or code into descriptive text.
+
+Documentation is produced last and nothing waits on it interactively, so
+setting JUM_BATCH_DOCS=1 routes the request through the provider's Batch API
+for lower cost at the expense of latency.
 '''
 
 from __future__ import annotations
 
+import os
 from typing import Dict, List
 
 from ..models.llm_client import LLMClient
@@ -16,10 +21,24 @@ from ..models.llm_client import LLMClient
 class DocAgent:
     '''Agent that produces documentation and commit messages.'''
 
+    SYSTEM_PROMPT = (
+        'You are a technical writer AI. You are given a list of changes and some context. '
+        'Write succinct documentation: a README update summarising the changes, a Markdown changelog entry, '
+        'and a concise commit message. Separate the three sections with "---" lines. '
+        'Use clear language and avoid redundancy.'
+    )
+    DEFAULT_MESSAGE = 'Updated code based on the latest task.'
+    # Returned without calling the model when there is nothing to document.
+    NO_CHANGES: Dict[str, str] = {
+        'readme_update': 'No code changes.',
+        'changelog_md': '',
+        'commit_message': 'No changes.',
+    }
+
     def __init__(self, llm_client: LLMClient) -> None:
         self.llm = llm_client
 
-    def generate_docs(self, changelog: List[str], context: str = '') -> Dict[str, str]:
+    async def generate_docs(self, changelog: List[str], context: str = '') -> Dict[str, str]:
         '''Generate documentation and a commit message.
 
         :param changelog: A list of human-readable log entries describing code
@@ -28,24 +47,29 @@ class DocAgent:
         :returns: A dictionary with keys `readme_update`, `changelog_md` and
             `commit_message`.
         '''
+        if not changelog:
+            return dict(self.NO_CHANGES)
+        # Joined outside the f-string: backslashes are not allowed in
+        # f-string expressions before Python 3.12.
+        changes = '\n'.join(changelog)
         prompt = (
-            'You are a technical writer AI. You are given a list of changes and some context. '
-            'Write succinct documentation: a README update summarising the changes, a Markdown changelog entry, '
-            'and a concise commit message. Separate the three sections with "---" lines.\\n'
-            f'Changes:\\n{chr(10).join(changelog)}\\n'
-            f'Context: {context}\\n'
-            'Use clear language and avoid redundancy.'
+            f'Changes:\n{changes}\n'
+            f'Context: {context}'
         )
         try:
-            response = self.llm.chat(prompt, temperature=0.2)
+            response = await self.llm.achat_batched(
+                prompt,
+                temperature=0.2,
+                system=self.SYSTEM_PROMPT,
+                batch=os.environ.get('JUM_BATCH_DOCS') == '1',
+            )
         except Exception:
             response = None
         if not response:
-            default_message = 'Updated code based on the latest task.'
             return {
-                'readme_update': default_message,
-                'changelog_md': '* ' + default_message,
-                'commit_message': default_message,
+                'readme_update': self.DEFAULT_MESSAGE,
+                'changelog_md': '* ' + self.DEFAULT_MESSAGE,
+                'commit_message': self.DEFAULT_MESSAGE,
             }
         # Expect three sections separated by '---'
         sections = response.split('---')
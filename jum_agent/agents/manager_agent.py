@@ -5,22 +5,54 @@ detailed tasks for the Dev, QA and Doc agents. It can also maintain the
 overall project context and constraints. In practice, this agent would
 construct a comprehensive roadmap using an LLM, but here it returns a simple
 structure for demonstration purposes.
+
+Plans that pass QA can be remembered in a `PlanCache`; recurring objectives
+are then answered from the cache without an LLM call. A cached plan that
+fails QA is removed again.
 '''
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..models.llm_client import LLMClient, error_status
+from ..utils import fastjson
+from ._plan_cache import PlanCache
 
-from ..models.llm_client import LLMClient
+_TASK_TYPES = ('dev', 'qa', 'doc')
+_JSON_MODE = {'type': 'json_object'}
+
+# A numbered plan line such as '1. DEV: Description', used when the model
+# ignores JSON mode. The agent label is optional; unlabelled tasks default
+# to 'dev'.
+_LINE_RE = re.compile(r'^\s*\d+[.)]\s*(?:(DEV|QA|DOC)\b\s*[:\-]?\s*)?(.+)$', re.IGNORECASE)
 
 
 class ManagerAgent:
     '''Agent that plans a project and assigns tasks to other agents.'''
 
-    def __init__(self, llm_client: LLMClient) -> None:
+    SYSTEM_PROMPT = (
+        'You are a project manager AI. You are given a software development objective, '
+        'some context and constraints. Break the objective into a sequence of tasks '
+        'with short descriptions. Label each task with the type of agent that '
+        'should handle it: dev for code generation, qa for testing, doc for documentation. '
+        'Return only a JSON object of the form '
+        '{"tasks": [{"type": "dev|qa|doc", "description": "..."}]}.'
+    )
+
+    def __init__(self, llm_client: LLMClient, plan_cache: Optional[PlanCache] = None) -> None:
         self.llm = llm_client
+        self.plan_cache = plan_cache
+        # Plans produced by the LLM that have not yet been confirmed by QA,
+        # with the context, constraints and prompt they were made for.
+        self._pending: Dict[str, Tuple[str, str, str, List[Dict[str, Any]]]] = {}
+        # Plans served from the plan cache, as the (matched objective,
+        # context, constraints) of the entry that was used.
+        self._served: Dict[str, Tuple[str, str, str]] = {}
 
-    def plan(self, objective: str, context: str = '', constraints: str = '') -> List[Dict[str, Any]]:
+    async def plan(self, objective: str, context: str = '', constraints: str = '') -> List[Dict[str, Any]]:
         '''Generate a list of tasks to accomplish the objective.
 
         :param objective: The overall goal to achieve.
@@ -29,45 +61,108 @@ class ManagerAgent:
         :returns: A list of task dictionaries. Each task has at least a
             description and a type (e.g. 'dev', 'qa', 'doc').
         '''
+        if self.plan_cache is not None:
+            cached = await asyncio.to_thread(self.plan_cache.lookup, objective, context, constraints)
+            if cached:
+                matched, tasks = cached
+                self._served[objective] = (matched, context, constraints)
+                return tasks
         prompt = (
-            'You are a project manager AI. You are given a software development objective, '
-            'some context and constraints. Break the objective into a sequence of tasks '
-            'with short descriptions. Label each task with the type of agent that '
-            'should handle it: DEV for code generation, QA for testing, DOC for documentation.\\n'
-            f'Objective: {objective}\\n'
-            f'Context: {context}\\n'
-            f'Constraints: {constraints}\\n'
-            'Return the tasks as a numbered list.'
+            f'Objective: {objective}\n'
+            f'Context: {context}\n'
+            f'Constraints: {constraints}'
         )
         try:
-            response = self.llm.chat(prompt, temperature=0.3)
-        except Exception:
+            response = await self.llm.achat_batched(
+                prompt,
+                temperature=0.3,
+                system=self.SYSTEM_PROMPT,
+                response_format=_JSON_MODE,
+            )
+        except Exception as exc:
             response = None
+            status = error_status(exc)
+            if status is not None and 400 <= status < 500 and status != 429:
+                # The server may not support JSON mode; ask again without it.
+                # The numbered-list parser below handles the free-form reply.
+                try:
+                    response = await self.llm.achat_batched(
+                        prompt, temperature=0.3, system=self.SYSTEM_PROMPT
+                    )
+                except Exception:
+                    response = None
         tasks: List[Dict[str, Any]] = []
         if not response:
             # Fallback: default single dev task
             tasks.append({'description': objective, 'type': 'dev'})
             return tasks
-        # Parse the response into tasks. Expect lines like '1. DEV: Description'
-        for line in response.splitlines():
-            line = line.strip()
-            if not line or not line[0].isdigit():
-                continue
-            # Remove numbering prefix
-            parts = line.split('.', 1)
-            body = parts[1].strip() if len(parts) > 1 else line
-            # Determine type: look for 'DEV', 'QA', 'DOC'
-            task_type = 'dev'
-            if body.lower().startswith('qa'):
-                task_type = 'qa'
-                body = body[2:].lstrip(' :')
-            elif body.lower().startswith('doc'):
-                task_type = 'doc'
-                body = body[3:].lstrip(' :')
-            elif body.lower().startswith('dev'):
-                task_type = 'dev'
-                body = body[3:].lstrip(' :')
-            tasks.append({'description': body.strip(), 'type': task_type})
+        tasks = _parse_json_tasks(response) or _parse_numbered_tasks(response)
         if not tasks:
             tasks.append({'description': objective, 'type': 'dev'})
+            return tasks
+        self._pending[objective] = (context, constraints, prompt, tasks)
         return tasks
+
+    async def record_success(self, objective: str) -> None:
+        '''Store the LLM plan for `objective` in the plan cache.
+
+        Called by the orchestrator once every task of the plan has passed QA.
+        Fallback plans and plans served from the cache are not stored.
+        '''
+        self._served.pop(objective, None)
+        pending = self._pending.pop(objective, None)
+        if pending is not None and self.plan_cache is not None:
+            context, constraints, _, tasks = pending
+            await asyncio.to_thread(self.plan_cache.insert, objective, tasks, context, constraints)
+
+    def discard(self, objective: str) -> None:
+        '''Forget the plan for `objective` after one of its tasks failed.
+
+        A plan served from the plan cache is deleted from it. An LLM plan is
+        not stored, and its reply is evicted from the response cache so the
+        next attempt asks for a new plan.
+        '''
+        served = self._served.pop(objective, None)
+        if served is not None and self.plan_cache is not None:
+            self.plan_cache.delete(*served)
+        pending = self._pending.pop(objective, None)
+        if pending is None:
+            return
+        prompt = pending[2]
+        for response_format in (_JSON_MODE, None):
+            self.llm.forget(
+                prompt, temperature=0.3, system=self.SYSTEM_PROMPT, response_format=response_format
+            )
+
+
+def _parse_json_tasks(response: str) -> List[Dict[str, Any]]:
+    '''Parse a `{"tasks": [...]}` JSON plan; return [] if it does not fit.'''
+    try:
+        data = fastjson.loads(response)
+    except fastjson.JSONDecodeError:
+        return []
+    raw_tasks = data.get('tasks') if isinstance(data, dict) else None
+    if not isinstance(raw_tasks, list):
+        return []
+    tasks: List[Dict[str, Any]] = []
+    for item in raw_tasks:
+        if not isinstance(item, dict) or not isinstance(item.get('description'), str):
+            return []
+        task_type = str(item.get('type', 'dev')).lower()
+        tasks.append({
+            'description': item['description'].strip(),
+            'type': task_type if task_type in _TASK_TYPES else 'dev',
+        })
+    return tasks
+
+
+def _parse_numbered_tasks(response: str) -> List[Dict[str, Any]]:
+    '''Parse a numbered plan with lines like '1. DEV: Description'.'''
+    tasks: List[Dict[str, Any]] = []
+    for line in response.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        task_type = (m.group(1) or 'dev').lower()
+        tasks.append({'description': m.group(2).strip(), 'type': task_type})
+    return tasks
@@ -5,17 +5,29 @@ requirements of the task. At this stage it performs a minimal validation by
 compiling and optionally executing the code. In a production system you
 would write tests specific to each task and use the language model to
 explain any failures.
+
+Compilation happens inline and rejects syntax errors immediately. Execution
+is handed to a dedicated single-thread executor, so the event loop can keep
+serving the LLM requests of other tasks while generated code runs, without
+tying up the default executor's threads. Output is captured by giving the
+code its own `print` rather than redirecting the process-wide stdout.
 '''
 
 from __future__ import annotations
 
-import contextlib
+import asyncio
+import functools
 import io
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from types import CodeType
 from typing import Any, Tuple
 
 from ..models.llm_client import LLMClient
 
+# Generated code runs one snippet at a time on this thread.
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jum-qa')
+
 
 class QaAgent:
     '''Agent that validates generated code.'''
@@ -23,7 +35,7 @@ class QaAgent:
     def __init__(self, llm_client: LLMClient) -> None:
         self.llm = llm_client
 
-    def check_code(self, code: str, task: str) -> Tuple[bool, str]:
+    async def check_code(self, code: str, task: str) -> Tuple[bool, str]:
         '''Check whether the generated code fulfils the task.
 
         For now this method simply attempts to compile the code and run it in a
@@ -37,16 +49,22 @@ class QaAgent:
         :returns: A tuple `(passed, feedback)`. If `passed` is False, the
             `feedback` contains a brief description of the failure.
         '''
-        local_namespace: dict[str, Any] = {}
         try:
             compiled = compile(code, filename='<generated>', mode='exec')
         except Exception as exc:
             return False, f'Compilation failed: {exc}'
-        # Capture stdout while running code
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_EXECUTOR, self._execute, compiled)
+
+    @staticmethod
+    def _execute(compiled: CodeType) -> Tuple[bool, str]:
+        '''Run compiled code in a sandbox namespace (called off the event loop).'''
+        local_namespace: dict[str, Any] = {}
+        # Capture the code's print output
         buf = io.StringIO()
+        sandbox_globals = {'print': functools.partial(print, file=buf)}
         try:
-            with contextlib.redirect_stdout(buf):
-                exec(compiled, {}, local_namespace)
+            exec(compiled, sandbox_globals, local_namespace)
         except Exception as exc:
             return False, f'Runtime error: {exc}'
         # In a real QA, we would check outputs or behaviours here.
@@ -8,9 +8,11 @@ Make sure to configure your .env file before running. See jum_agent/utils/env.py
 '''
 
 import argparse
+import asyncio
 import sys
 
 from .orchestrator import Orchestrator
+from .models.batching import BatchingLLMClient
 from .models.llm_client import LLMClient
 from .utils.env import load_env
 
@@ -19,6 +21,11 @@ def main() -> None:
     parser = argparse.ArgumentParser(
         description='Run a task through the Jum Agent orchestrator.'
     )
+    parser.add_argument(
+        '--no-plan-cache',
+        action='store_true',
+        help='Always ask the LLM for a fresh plan instead of reusing cached plans',
+    )
     parser.add_argument(
         'task',
         nargs=argparse.REMAINDER,
@@ -33,14 +40,21 @@ def main() -> None:
     load_env()
 
     # Initialise the LLM client and orchestrator
-    client = LLMClient()
-    orchestrator = Orchestrator(client)
+    client = BatchingLLMClient()
+    orchestrator = Orchestrator(client, use_plan_cache=not args.no_plan_cache)
 
     # Run the orchestrator
     print(f'Incoming task: {task_description}')
-    result = orchestrator.handle_task(task_description)
+    result = asyncio.run(_run(client, orchestrator, task_description))
     print('=== Result ===')
     print(result)
 
+async def _run(client: LLMClient, orchestrator: Orchestrator, task_description: str) -> str:
+    '''Run the orchestrator and release the client's pooled connections.'''
+    try:
+        return await orchestrator.handle_task(task_description)
+    finally:
+        await client.aclose()
+
 if __name__ == '__main__':
     main()
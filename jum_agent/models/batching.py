@@ -0,0 +1,128 @@
+'''Micro-batching front end for the LLM client.
+
+When several agents issue prompts at nearly the same moment, local servers
+such as vLLM or Ollama schedule them more efficiently if they arrive
+together. `BatchingLLMClient` collects calls to `achat_batched` that arrive
+within a short window (`max_wait_ms`) and dispatches them as one batch of
+concurrent requests over the client's shared HTTP/2 connection, so the
+server sees them side by side and can batch them in a single forward pass.
+Each caller awaits a future bound to its own slot in the batch.
+
+Streaming calls (`astream`) take part in the same windows: a stream waits
+for the window it arrived in to close and is then started together with the
+rest of that batch.
+'''
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from .llm_client import LLMClient
+
+# (prompt, kwargs, future). For a stream waiting to start, kwargs is None and
+# the future is resolved once its batch is dispatched.
+_Item = Tuple[str, Optional[Dict[str, Any]], 'asyncio.Future[str]']
+
+
+class BatchingLLMClient(LLMClient):
+    '''LLMClient that coalesces concurrent `achat_batched` and `astream` calls.'''
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        max_batch: int = 32,
+        max_wait_ms: float = 10,
+    ) -> None:
+        super().__init__(base_url=base_url, model=model)
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional['asyncio.Queue[_Item]'] = None
+        self._worker: Optional['asyncio.Task[None]'] = None
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Set['asyncio.Task[None]'] = set()
+
+    async def achat_batched(self, prompt: str, **kwargs: Any) -> str:
+        '''Queue a chat request and wait for its slot in the next batch.
+
+        Accepts the same arguments as :meth:`LLMClient.achat`.
+        '''
+        return await self._enqueue(prompt, kwargs)
+
+    async def astream(self, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        '''Stream a reply, starting it together with the next batch.
+
+        Accepts the same arguments as :meth:`LLMClient.astream`.
+        '''
+        await self._enqueue(prompt, None)
+        chunks = super().astream(prompt, **kwargs)
+        try:
+            async for text in chunks:
+                yield text
+        finally:
+            await chunks.aclose()
+
+    async def _enqueue(self, prompt: str, kwargs: Optional[Dict[str, Any]]) -> str:
+        '''Add a request to the current window and wait for its result.'''
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        future: 'asyncio.Future[str]' = loop.create_future()
+        assert self._queue is not None
+        await self._queue.put((prompt, kwargs, future))
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        '''Start the batching worker on `loop` if it is not already running.'''
+        if self._batch_loop is loop and self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._batch_loop = loop
+        self._worker = loop.create_task(self._drain(self._queue))
+
+    async def _drain(self, queue: 'asyncio.Queue[_Item]') -> None:
+        '''Collect queued requests into batches and dispatch them.'''
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[_Item] = [await queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch without waiting so the next window can start filling.
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[_Item]) -> None:
+        '''Send every request in `batch` concurrently and resolve its future.'''
+        chats = []
+        for item in batch:
+            if item[1] is not None:
+                chats.append(item)
+            elif not item[2].done():
+                # Let the stream start alongside the chat requests
+                item[2].set_result('')
+        results = await asyncio.gather(
+            *(self.achat(prompt, **kwargs) for prompt, kwargs, _ in chats),
+            return_exceptions=True,
+        )
+        for (_, _, future), result in zip(chats, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def aclose(self) -> None:
+        '''Stop the batching worker and close the pooled HTTP client.'''
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        await super().aclose()
@@ -0,0 +1,154 @@
+'''On-disk cache for LLM responses.
+
+Agents frequently send the same prompt more than once, for example when the
+same objective is planned again or a dev instruction is rebuilt from an
+identical plan summary. `ResponseCache` stores completed responses so such
+calls can skip the model entirely. It has two tiers:
+
+* **exact** – responses are keyed by a SHA-256 of the request parameters and
+  the prompt, so only byte-identical requests hit.
+* **semantic** – on an exact miss the prompt is embedded with a small
+  sentence-transformers model and compared against the embeddings of
+  previously cached prompts sent with the same parameters; a cosine
+  similarity at or above the threshold counts as a hit.
+
+The tier is selected with the LLM_CACHE environment variable (`exact`,
+`semantic` or `off`, the default) and entries are stored under
+LLM_CACHE_DIR, which defaults to ~/.cache/jum_agent/llm. Callers should
+`delete` a response that turns out to be unusable (e.g. code that fails QA)
+so it is not served again. The `diskcache` package is required for
+caching and `sentence-transformers` for the semantic tier; when either is
+missing the cache degrades to the next simpler mode.
+'''
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+try:
+    import diskcache  # type: ignore
+except ImportError:
+    diskcache = None  # type: ignore
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'jum_agent' / 'llm'
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+_embedder: Any = None
+
+
+def embed(text: str) -> Optional[List[float]]:
+    '''Return a unit-length embedding of `text`, or None if unavailable.
+
+    The sentence-transformers model is loaded on first use and shared by
+    every caller in the process.
+    '''
+    global _embedder
+    if _embedder is None:
+        try:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+        except ImportError:
+            return None
+        _embedder = SentenceTransformer(EMBEDDING_MODEL)
+    vector = _embedder.encode(text, normalize_embeddings=True)
+    return [float(x) for x in vector]
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    '''Cosine similarity of two unit-length vectors.'''
+    return sum(x * y for x, y in zip(a, b))
+
+
+def _digest(parts: Sequence[Any]) -> str:
+    return hashlib.sha256(json.dumps(list(parts), sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    '''Two-tier (exact and semantic) cache of LLM responses.'''
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        semantic: bool = False,
+        threshold: float = 0.95,
+    ) -> None:
+        if diskcache is None:
+            raise RuntimeError('diskcache is required for ResponseCache')
+        self.directory = Path(directory) if directory else DEFAULT_CACHE_DIR
+        self.semantic = semantic
+        self.threshold = threshold
+        self._store = diskcache.Cache(str(self.directory))
+
+    @classmethod
+    def from_env(cls) -> Optional['ResponseCache']:
+        '''Build a cache from LLM_CACHE / LLM_CACHE_DIR, or None if disabled.'''
+        mode = os.environ.get('LLM_CACHE', 'off').strip().lower()
+        if mode == 'off' or diskcache is None:
+            return None
+        return cls(directory=os.environ.get('LLM_CACHE_DIR'), semantic=mode == 'semantic')
+
+    def get(self, prompt: str, params: Sequence[Any]) -> Optional[str]:
+        '''Return a cached response for `prompt` sent with `params`, if any.
+
+        :param prompt: The prompt text.
+        :param params: Every other request field that influences the reply
+            (model, temperature, max_tokens, ...).
+        '''
+        key = self._lookup_key(prompt, params)
+        return self._store.get(key) if key else None
+
+    def delete(self, prompt: str, params: Sequence[Any]) -> None:
+        '''Drop the response that `get` would return for `prompt`, if any.'''
+        key = self._lookup_key(prompt, params)
+        if key is None:
+            return
+        self._store.delete(key)
+        if not self.semantic:
+            return
+        index_key = self._index_key(params)
+        with self._store.transact():
+            index = self._store.get(index_key, [])
+            self._store.set(index_key, [entry for entry in index if entry[1] != key])
+
+    def _lookup_key(self, prompt: str, params: Sequence[Any]) -> Optional[str]:
+        '''Return the store key of the best cached match for `prompt`.'''
+        key = _digest([*params, prompt])
+        if key in self._store:
+            return key
+        if not self.semantic:
+            return None
+        embedding = embed(prompt)
+        if embedding is None:
+            return None
+        best_key, best_score = None, self.threshold
+        for cached_embedding, candidate in self._store.get(self._index_key(params), []):
+            score = cosine_similarity(embedding, cached_embedding)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def set(self, prompt: str, params: Sequence[Any], response: str) -> None:
+        '''Store `response` for `prompt` sent with `params`.'''
+        key = _digest([*params, prompt])
+        self._store.set(key, response)
+        if not self.semantic:
+            return
+        embedding = embed(prompt)
+        if embedding is None:
+            return
+        index_key = self._index_key(params)
+        with self._store.transact():
+            index = self._store.get(index_key, [])
+            index.append((embedding, key))
+            self._store.set(index_key, index)
+
+    def close(self) -> None:
+        '''Close the underlying disk cache.'''
+        self._store.close()
+
+    @staticmethod
+    def _index_key(params: Sequence[Any]) -> str:
+        return 'semantic:' + _digest(params)
@@ -0,0 +1,119 @@
+'''Adaptive concurrency limit for requests to the LLM server.
+
+With async agents and micro-batching the orchestrator can issue more
+requests than the server handles well, which shows up as rising latency or
+HTTP 429 responses. `SemaphoreController` bounds the number of requests in
+flight and adjusts that bound as responses come back:
+
+* when a response reports few remaining requests in its
+  `x-ratelimit-remaining-requests` header, the limit shrinks by one before
+  the server starts rejecting requests;
+* after a run of successful responses the limit grows by one (additive
+  increase), up to `max_limit`;
+* on a 429 response the limit is halved (multiplicative decrease).
+
+Current values are published in the `stats` dict.
+'''
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, Dict, Mapping, Optional
+
+
+class SemaphoreController:
+    '''AIMD concurrency limiter driven by responses and rate-limit headers.'''
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase_after: int = 10,
+        low_remaining: int = 2,
+    ) -> None:
+        self.limit = max(min_limit, min(max_in_flight, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_after = increase_after
+        self.low_remaining = low_remaining
+        self.stats: Dict[str, Any] = {'limit': self.limit, 'in_flight': 0, 'requests': 0, 'rate_limited': 0}
+        self._in_flight = 0
+        self._successes = 0
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        '''Return the condition used to wait for a slot on the running loop.'''
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+            self._in_flight = 0
+        return self._cond
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        '''Wait until a request may be sent and hold the slot while it runs.'''
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+            self.stats['in_flight'] = self._in_flight
+        try:
+            yield
+        finally:
+            async with cond:
+                self._in_flight -= 1
+                self.stats['in_flight'] = self._in_flight
+                cond.notify_all()
+
+    def on_response(self, headers: Mapping[str, str]) -> None:
+        '''Record a successful response and adapt the limit to its headers.'''
+        self.stats['requests'] += 1
+        remaining = _int_header(headers, 'x-ratelimit-remaining-requests')
+        if remaining is not None and remaining < self.low_remaining:
+            self._successes = 0
+            self._set_limit(self.limit - 1)
+            return
+        self._successes += 1
+        if self._successes >= self.increase_after:
+            self._successes = 0
+            self._set_limit(self.limit + 1)
+
+    def on_rate_limited(self) -> None:
+        '''Record a 429 response by halving the limit.'''
+        self.stats['requests'] += 1
+        self.stats['rate_limited'] += 1
+        self._successes = 0
+        self._set_limit(self.limit // 2)
+
+    def _set_limit(self, limit: int) -> None:
+        self.limit = max(self.min_limit, min(limit, self.max_limit))
+        self.stats['limit'] = self.limit
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def retry_delay(headers: Mapping[str, str], attempt: int) -> float:
+    '''Seconds to wait before retrying a rate-limited request.
+
+    Honours a numeric `retry-after` header, otherwise backs off
+    exponentially.
+    '''
+    value = headers.get('retry-after')
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+    return float(2 ** attempt)
@@ -5,23 +5,107 @@ an OpenAI-compatible local server such as Ollama or LM Studio. It reads
 configuration from environment variables at initialisation time: LLM_BASE_URL
 points at the local API endpoint and LLM_MODEL names the model to use.
 
-If the OpenAI Python library is installed, the client uses it; otherwise it
-falls back to a simple HTTP POST via urllib.request. In both cases the
-interface is the same: call chat(prompt, **kwargs) and receive the model’s
-response as a string.
+If the OpenAI Python library is installed, the client uses it (imported on
+first use); otherwise it falls back to HTTP requests over pooled `httpx`
+clients. In both cases the interface is the same: call chat(prompt, **kwargs)
+and receive the model’s response as a string. Async callers can use `achat`
+or `astream` instead; these requests pass through the concurrency limiter in
+`jum_agent.models.limiter`. Responses go through the optional
+`ResponseCache` from `jum_agent.models.cache`.
 '''
 
 from __future__ import annotations
 
-import json
+import asyncio
+import logging
 import os
-import urllib.request
-from typing import Any, Dict, Optional
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+
+import httpx
+
+from ..utils import fastjson
+from .cache import ResponseCache
+from .limiter import SemaphoreController, retry_delay
+
+logger = logging.getLogger(__name__)
+
+_openai: Any = None
+_openai_checked = False
+
+# Seconds between status checks of a submitted batch, and the statuses in
+# which a batch will make no further progress.
+_BATCH_POLL_SECONDS = 10.0
+_BATCH_FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+# How often a rate-limited or transiently failed request is retried.
+_MAX_RETRIES = 3
+# Sent with the raw JSON requests only. The pooled clients must not set a
+# default Content-Type: the OpenAI SDK shares them, and httpx would keep that
+# default on its multipart file uploads.
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def _get_openai() -> Any:
+    '''Import the OpenAI library on first use; return None if unavailable.'''
+    global _openai, _openai_checked
+    if not _openai_checked:
+        try:
+            import openai  # type: ignore
+        except ImportError:
+            openai = None  # type: ignore
+        _openai = openai
+        _openai_checked = True
+    return _openai
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    '''HTTP status of a failed request, for httpx and OpenAI SDK errors.'''
+    return getattr(getattr(exc, 'response', None), 'status_code', None)
+
+
+def _close_with_loop(client: httpx.AsyncClient) -> AsyncGenerator[None, None]:
+    '''Arrange for `client` to be closed when the running loop shuts down.
+
+    The returned async generator is started here, which registers it with
+    the loop; `asyncio.run` finalises such generators before closing the
+    loop, so the `finally` clause closes the client while its connections
+    can still be shut down cleanly. Closing the generator closes the client
+    early.
+    '''
+
+    async def closer() -> AsyncGenerator[None, None]:
+        try:
+            yield
+        finally:
+            await client.aclose()
+
+    gen = closer()
+    try:
+        # Run the generator up to its `yield`; this never suspends.
+        gen.asend(None).send(None)
+    except StopIteration:
+        pass
+    return gen
+
+
+def _is_transient(exc: BaseException) -> bool:
+    '''Whether a failed request is worth retrying apart from rate limiting.
+
+    True for 408 and 5xx responses (e.g. a 503 while the server loads a
+    model) and for connection errors and timeouts.
+    '''
+    status = error_status(exc)
+    if status is not None:
+        return status == 408 or status >= 500
+    if isinstance(exc, httpx.TransportError):
+        return True
+    openai = _get_openai()
+    return openai is not None and isinstance(exc, openai.APIConnectionError)
+
+
+async def collect(stream: AsyncIterator[str]) -> str:
+    '''Concatenate every chunk of a response stream.'''
+    return ''.join([chunk async for chunk in stream])
 
-try:
-    import openai  # type: ignore
-except ImportError:
-    openai = None  # type: ignore
 
 class LLMClient:
     '''Client for interacting with a local LLM server.'''
@@ -30,46 +114,429 @@ class LLMClient:
         self.base_url = base_url or os.environ.get('LLM_BASE_URL', 'http://localhost:11434/v1')
         self.model = model or os.environ.get('LLM_MODEL', 'mistral:7b')
         self.api_key = os.environ.get('LLM_API_KEY', 'dummy')
-        if openai is not None:
-            # Configure OpenAI client to point at local server
-            openai.base_url = self.base_url
-            openai.api_key = self.api_key
+        self.timeout = float(os.environ.get('LLM_TIMEOUT', '120'))
+        self._http = httpx.Client(
+            base_url=self.base_url,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32),
+            headers={'Authorization': f'Bearer {self.api_key}'},
+            timeout=self.timeout,
+        )
+        self._aclient: Optional[httpx.AsyncClient] = None
+        self._aclient_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._aclient_closer: Optional[AsyncGenerator[None, None]] = None
+        self._openai_client: Any = None
+        self._async_openai_client: Any = None
+        self._async_openai_pool: Optional[httpx.AsyncClient] = None
+        self.cache = ResponseCache.from_env()
+        self.limiter = SemaphoreController(max_in_flight=int(os.environ.get('LLM_MAX_IN_FLIGHT', '8')))
+        self.stats = self.limiter.stats
 
-    def chat(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2048) -> str:
+    def chat(
+        self,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+        system: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
         '''Send a chat request to the local LLM and return the response text.
 
         :param prompt: The prompt string to send.
         :param temperature: Sampling temperature.
         :param max_tokens: Maximum number of tokens in the response.
+        :param system: Optional system message placed before the prompt.
+        :param response_format: Optional OpenAI-style response format, e.g.
+            `{'type': 'json_object'}` to request JSON output.
         :returns: The assistant’s reply as a string.
         '''
-        if openai is not None:
-            completion = openai.chat.completions.create(
-                model=self.model,
-                messages=[{'role': 'user', 'content': prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-            return completion.choices[0].message.content
+        params = [self.model, temperature, max_tokens, system, response_format]
+        if self.cache is not None:
+            cached = self.cache.get(prompt, params)
+            if cached is not None:
+                return cached
+        response = self._chat(self._payload(prompt, temperature, max_tokens, system, response_format))
+        if self.cache is not None and response:
+            self.cache.set(prompt, params, response)
+        return response
 
-        # Fallback to HTTP
-        url = f'{self.base_url}/chat/completions'
+    def _payload(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        system: Optional[str],
+        response_format: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        '''Build the body of a chat completion request.'''
         data: Dict[str, Any] = {
             'model': self.model,
-            'messages': [{'role': 'user', 'content': prompt}],
+            'messages': self._messages(prompt, system),
             'temperature': temperature,
             'max_tokens': max_tokens,
         }
-        req = urllib.request.Request(
-            url,
-            data=json.dumps(data).encode('utf-8'),
-            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {self.api_key}'},
-        )
-        with urllib.request.urlopen(req) as resp:
-            body = resp.read().decode('utf-8')
-            payload = json.loads(body)
+        if response_format is not None:
+            data['response_format'] = response_format
+        return data
+
+    @staticmethod
+    def _messages(prompt: str, system: Optional[str]) -> List[Dict[str, str]]:
+        '''Build the message list, with the static system text first.'''
+        messages = [{'role': 'user', 'content': prompt}]
+        if system:
+            messages.insert(0, {'role': 'system', 'content': system})
+        return messages
+
+    def _get_openai_client(self) -> Any:
+        '''Return this client's `openai.OpenAI` instance, or None.
+
+        The instance is created on first use and sends its requests through
+        the pooled `httpx.Client`.
+        '''
+        if self._openai_client is None:
+            openai = _get_openai()
+            if openai is None:
+                return None
+            self._openai_client = openai.OpenAI(
+                base_url=self.base_url, api_key=self.api_key, http_client=self._http
+            )
+        return self._openai_client
+
+    def _get_async_openai_client(self) -> Any:
+        '''Return an `openai.AsyncOpenAI` bound to the current loop's pool, or None.
+
+        The SDK's own retries are disabled so that every 429 reaches the
+        concurrency limiter; :meth:`_achat` and :meth:`_astream` retry
+        failed requests themselves.
+        '''
+        openai = _get_openai()
+        if openai is None:
+            return None
+        aclient = self._get_aclient()
+        if self._async_openai_pool is not aclient:
+            self._async_openai_client = openai.AsyncOpenAI(
+                base_url=self.base_url, api_key=self.api_key, http_client=aclient, max_retries=0
+            )
+            self._async_openai_pool = aclient
+        return self._async_openai_client
+
+    def _chat(self, data: Dict[str, Any]) -> str:
+        '''Send an uncached chat request to the server.'''
+        client = self._get_openai_client()
+        if client is not None:
+            completion = client.chat.completions.create(**data)
+            return completion.choices[0].message.content
+
+        # Fallback to HTTP over the pooled client
+        resp = self._http.post('/chat/completions', content=fastjson.dumps(data), headers=_JSON_HEADERS)
+        resp.raise_for_status()
+        payload = fastjson.loads(resp.content)
         # The structure matches the OpenAI API.
         try:
             return payload['choices'][0]['message']['content']
         except Exception:
             return ''
+
+    def _get_aclient(self) -> httpx.AsyncClient:
+        '''Return the pooled async HTTP client for the running event loop.
+
+        Connections in an `httpx.AsyncClient` are bound to the loop that opened
+        them, so a new client is created whenever the caller runs on a
+        different loop (e.g. successive `asyncio.run` invocations). Each client
+        is closed when its loop shuts down (see :func:`_close_with_loop`).
+        '''
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            self._aclient = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=32),
+                timeout=self.timeout,
+                headers={'Authorization': f'Bearer {self.api_key}'},
+            )
+            self._aclient_loop = loop
+            self._aclient_closer = _close_with_loop(self._aclient)
+        return self._aclient
+
+    async def achat(
+        self,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+        system: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        batch: bool = False,
+    ) -> str:
+        '''Asynchronously send a chat request and return the response text.
+
+        Takes the same arguments as :meth:`chat`. Requests issued concurrently
+        from the same event loop are multiplexed over a single HTTP/2
+        connection.
+
+        :param batch: Submit the request through the provider's Batch API and
+            wait for the result. This can take minutes; the request is sent
+            normally if the Batch API is unavailable.
+        '''
+        params = [self.model, temperature, max_tokens, system, response_format]
+        cached = await self._acache_get(prompt, params)
+        if cached is not None:
+            return cached
+        data = self._payload(prompt, temperature, max_tokens, system, response_format)
+        response = None
+        if batch:
+            try:
+                response = await self._achat_via_batch(data)
+            except Exception as exc:
+                logger.warning('Batch API request failed, sending directly: %s', exc)
+        if response is None:
+            response = await self._achat(data)
+        if response:
+            await self._acache_set(prompt, params, response)
+        return response
+
+    def forget(
+        self,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+        system: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        '''Evict the cached response for a request, e.g. after it failed QA.
+
+        Takes the same arguments as :meth:`chat`.
+        '''
+        if self.cache is not None:
+            self.cache.delete(prompt, [self.model, temperature, max_tokens, system, response_format])
+
+    async def _acache_get(self, prompt: str, params: List[Any]) -> Optional[str]:
+        '''Look up the cache without blocking the event loop.'''
+        if self.cache is None:
+            return None
+        return await asyncio.to_thread(self.cache.get, prompt, params)
+
+    async def _acache_set(self, prompt: str, params: List[Any], response: str) -> None:
+        '''Store a response in the cache without blocking the event loop.'''
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, prompt, params, response)
+
+    async def achat_batched(self, prompt: str, **kwargs: Any) -> str:
+        '''Send a chat request that may be coalesced with concurrent ones.
+
+        The base client has no batching and simply awaits :meth:`achat`;
+        `BatchingLLMClient` overrides this to group requests.
+        '''
+        return await self.achat(prompt, **kwargs)
+
+    async def _achat(self, data: Dict[str, Any]) -> str:
+        '''Send an uncached chat request within the concurrency limit.
+
+        Failed requests are retried as described in :meth:`_retry_delay`.
+        '''
+        attempt = 0
+        while True:
+            async with self.limiter.slot():
+                try:
+                    content, headers = await self._achat_once(data)
+                except Exception as exc:
+                    delay = self._retry_delay(exc, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    self.limiter.on_response(headers)
+                    return content
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        '''Seconds to wait before retrying a failed request, or None to give up.
+
+        HTTP 429 responses shrink the concurrency limit; 408 and 5xx
+        responses and connection errors are retried without changing it.
+        Either way the server's `retry-after` delay is honoured if present,
+        otherwise the wait backs off exponentially.
+        '''
+        if error_status(exc) == 429:
+            self.limiter.on_rate_limited()
+        elif not _is_transient(exc):
+            return None
+        if attempt >= _MAX_RETRIES:
+            return None
+        headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+        return retry_delay(headers, attempt)
+
+    async def _achat_once(self, data: Dict[str, Any]) -> Tuple[str, Mapping[str, str]]:
+        '''Send one chat request; return the reply text and response headers.'''
+        client = self._get_async_openai_client()
+        if client is not None:
+            raw = await client.chat.completions.with_raw_response.create(**data)
+            completion = raw.parse()
+            return completion.choices[0].message.content, raw.headers
+        resp = await self._get_aclient().post(
+            '/chat/completions', content=fastjson.dumps(data), headers=_JSON_HEADERS
+        )
+        resp.raise_for_status()
+        payload = fastjson.loads(resp.content)
+        try:
+            return payload['choices'][0]['message']['content'], resp.headers
+        except Exception:
+            return '', resp.headers
+
+    async def _achat_via_batch(self, data: Dict[str, Any]) -> str:
+        '''Run a single chat completion through the Batch API.
+
+        Waits at most JUM_BATCH_TIMEOUT seconds, then cancels the batch and
+        raises so the caller can send the request directly.
+        '''
+        client = self._get_async_openai_client()
+        if client is None:
+            raise RuntimeError('the Batch API requires the openai package')
+        timeout = float(os.environ.get('JUM_BATCH_TIMEOUT', '300'))
+        request = {'custom_id': 'jum-agent', 'method': 'POST', 'url': '/v1/chat/completions', 'body': data}
+        input_file = await client.files.create(
+            file=('batch.jsonl', fastjson.dumps(request) + b'\n'), purpose='batch'
+        )
+        file_ids = [input_file.id]
+        try:
+            job = await client.batches.create(
+                input_file_id=input_file.id, endpoint='/v1/chat/completions', completion_window='24h'
+            )
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while job.status not in _BATCH_FINAL_STATUSES:
+                if loop.time() >= deadline:
+                    await client.batches.cancel(job.id)
+                    raise TimeoutError(f'batch {job.id} did not finish within {timeout:g}s')
+                await asyncio.sleep(min(_BATCH_POLL_SECONDS, max(0.0, deadline - loop.time())))
+                job = await client.batches.retrieve(job.id)
+            file_ids += [fid for fid in (job.output_file_id, job.error_file_id) if fid]
+            if job.status != 'completed' or not job.output_file_id:
+                raise RuntimeError(f'batch {job.id} ended with status {job.status}')
+            output = await client.files.content(job.output_file_id)
+            result = fastjson.loads(output.content.splitlines()[0])
+            return result['response']['body']['choices'][0]['message']['content']
+        finally:
+            for file_id in file_ids:
+                try:
+                    await client.files.delete(file_id)
+                except Exception as exc:
+                    logger.warning('Could not delete batch file %s: %s', file_id, exc)
+
+    async def astream(
+        self,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+        system: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        '''Stream the response text as it is generated.
+
+        Takes the same arguments as :meth:`chat`. Closing the iterator early
+        (e.g. with `aclose()`) aborts the request. Only complete responses are
+        stored in the cache; a cache hit is yielded as a single chunk.
+        '''
+        params = [self.model, temperature, max_tokens, system, response_format]
+        cached = await self._acache_get(prompt, params)
+        if cached is not None:
+            yield cached
+            return
+        data = self._payload(prompt, temperature, max_tokens, system, response_format)
+        data['stream'] = True
+        parts: List[str] = []
+        chunks = self._astream(data)
+        try:
+            async for text in chunks:
+                parts.append(text)
+                yield text
+        finally:
+            # Close the HTTP stream promptly if the caller stops early
+            await chunks.aclose()
+        if parts:
+            await self._acache_set(prompt, params, ''.join(parts))
+
+    async def _astream(self, data: Dict[str, Any]) -> AsyncIterator[str]:
+        '''Yield the content deltas of a streamed chat completion.
+
+        The request holds a concurrency slot until the stream ends. A failure
+        while the stream is being set up (before anything was yielded) is
+        retried like in :meth:`_achat`.
+        '''
+        attempt = 0
+        while True:
+            async with self.limiter.slot():
+                chunks = self._astream_once(data)
+                try:
+                    try:
+                        first = await chunks.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    except Exception as exc:
+                        delay = self._retry_delay(exc, attempt)
+                        if delay is None:
+                            raise
+                    else:
+                        yield first
+                        async for text in chunks:
+                            yield text
+                        return
+                finally:
+                    await chunks.aclose()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _astream_once(self, data: Dict[str, Any]) -> AsyncIterator[str]:
+        '''Send one streaming request and yield its content deltas.'''
+        client = self._get_async_openai_client()
+        if client is not None:
+            stream = await client.chat.completions.create(**data)
+            self.limiter.on_response(stream.response.headers)
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+            return
+
+        # Fallback: parse the server-sent events directly
+        async with self._get_aclient().stream(
+            'POST', '/chat/completions', content=fastjson.dumps(data), headers=_JSON_HEADERS
+        ) as resp:
+            resp.raise_for_status()
+            self.limiter.on_response(resp.headers)
+            async for line in resp.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                body = line[5:].strip()
+                if body == '[DONE]':
+                    break
+                choices = fastjson.loads(body).get('choices') or []
+                text = choices[0].get('delta', {}).get('content') if choices else None
+                if text:
+                    yield text
+
+    def close(self) -> None:
+        '''Close the pooled sync HTTP client.'''
+        self._http.close()
+
+    def __enter__(self) -> 'LLMClient':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def aclose(self) -> None:
+        '''Close the pooled async HTTP client.
+
+        The sync client used by :meth:`chat` stays open; release it with
+        :meth:`close`.
+        '''
+        closer = self._aclient_closer
+        self._aclient = None
+        self._aclient_loop = None
+        self._aclient_closer = None
+        self._async_openai_client = None
+        self._async_openai_pool = None
+        if closer is not None:
+            await closer.aclose()
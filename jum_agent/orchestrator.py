@@ -9,13 +9,15 @@ produce and verify the code respectively.
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from .models.llm_client import LLMClient
-from .agents.dev_agent import DevAgent
+from .agents.dev_agent import CodeGenerationError, DevAgent, ModelRefusal
 from .agents.qa_agent import QaAgent
 from .agents.manager_agent import ManagerAgent
+from .agents._plan_cache import PlanCache
 from .agents.doc_agent import DocAgent
 from .utils.memory import append_log
 
@@ -24,40 +26,65 @@ logger = logging.getLogger(__name__)
 class Orchestrator:
     '''Orchestrates development tasks using local LLMs and multiple agents.'''
 
-    def __init__(self, llm_client: LLMClient, max_iterations: int = 3) -> None:
+    def __init__(self, llm_client: LLMClient, max_iterations: int = 3, use_plan_cache: bool = True) -> None:
         self.llm = llm_client
-        self.manager = ManagerAgent(llm_client)
+        self.manager = ManagerAgent(llm_client, PlanCache.from_env() if use_plan_cache else None)
         self.dev_agent = DevAgent(llm_client)
         self.qa_agent = QaAgent(llm_client)
         self.doc_agent = DocAgent(llm_client)
         self.max_iterations = max_iterations
 
-    def _plan(self, objective: str) -> Dict[str, Any]:
+    async def _plan(self, objective: str) -> Dict[str, Any]:
         '''Create a high-level plan for a task using the Manager agent.'''
-        tasks = self.manager.plan(objective)
+        tasks = await self.manager.plan(objective)
         return {'summary': objective, 'tasks': tasks}
 
-    def handle_task(self, objective: str) -> str:
+    async def _run_dev(self, description: str) -> Tuple[str, bool, str]:
+        '''Generate code for a dev task and run QA on it.
+
+        :returns: A tuple `(code, passed, feedback)`.
+        '''
+        plan = {'summary': description, 'steps': [description]}
+        try:
+            code_result = await self.dev_agent.generate_code(description, plan)
+        except ModelRefusal as exc:
+            append_log('dev', {'task': description, 'refused': str(exc)})
+            return '', False, f'model refused: {exc}'
+        except CodeGenerationError as exc:
+            append_log('dev', {'task': description, 'error': str(exc)})
+            return '', False, f'no code was generated: {exc}'
+        append_log('dev', {'task': description, 'code': code_result})
+        # QA automatically runs after dev
+        passed, feedback = await self.qa_agent.check_code(code_result, description)
+        append_log('qa', {'task': description, 'passed': passed, 'feedback': feedback})
+        if not passed:
+            # Do not serve the rejected code again from the response cache
+            self.dev_agent.discard(description, plan)
+        return code_result, passed, feedback
+
+    async def handle_task(self, objective: str) -> str:
         '''Handle a user objective end-to-end and return a result message.'''
         # Generate a plan of tasks using the Manager
-        plan = self._plan(objective)
+        plan = await self._plan(objective)
         tasks = plan.get('tasks', [])
         logger.info('Manager plan: %s', tasks)
         changelog: List[str] = []
         context: str = ''
+        # Dev tasks are independent of each other, so develop and check them
+        # all concurrently; results are consumed below in plan order.
+        dev_tasks = [task for task in tasks if task.get('type', 'dev').lower() == 'dev']
+        dev_results = iter(await asyncio.gather(*(
+            self._run_dev(task.get('description', '')) for task in dev_tasks
+        )))
         for idx, task in enumerate(tasks, 1):
             description = task.get('description', '')
             task_type = task.get('type', 'dev').lower()
             logger.info('Executing task %d/%d: type=%s, description=%s', idx, len(tasks), task_type, description)
             if task_type == 'dev':
-                # Developer writes code
-                code_result = self.dev_agent.generate_code(description, {'summary': description, 'steps': [description]})
-                append_log('dev', {'task': description, 'code': code_result})
-                # QA automatically runs after dev
-                passed, feedback = self.qa_agent.check_code(code_result, description)
-                append_log('qa', {'task': description, 'passed': passed, 'feedback': feedback})
+                code_result, passed, feedback = next(dev_results)
                 if not passed:
                     # If QA fails, return immediately with feedback
+                    self.manager.discard(objective)
                     return (
                         'Task ' + repr(description) + ' failed during QA.\n'
                         + 'Feedback: ' + feedback + '\n'
@@ -67,9 +94,10 @@ class Orchestrator:
                 changelog.append(f'Implemented: {description}')
             elif task_type == 'qa':
                 # Standalone QA task (rare)
-                passed, feedback = self.qa_agent.check_code('', description)
+                passed, feedback = await self.qa_agent.check_code('', description)
                 append_log('qa', {'task': description, 'passed': passed, 'feedback': feedback})
                 if not passed:
+                    self.manager.discard(objective)
                     return 'QA task ' + repr(description) + ' failed: ' + feedback
             elif task_type == 'doc':
                 # Documentation is generated after all dev and qa tasks, so skip here
@@ -77,9 +105,15 @@ class Orchestrator:
             else:
                 logger.warning('Unknown task type %s', task_type)
 
-        # After all tasks, generate documentation
-        docs = self.doc_agent.generate_docs(changelog, context)
-        append_log('doc', {'changelog': changelog, 'docs': docs})
+        # After all tasks, generate documentation (nothing to document if
+        # the plan produced no changes)
+        if changelog:
+            docs = await self.doc_agent.generate_docs(changelog, context)
+            append_log('doc', {'changelog': changelog, 'docs': docs})
+        else:
+            docs = dict(DocAgent.NO_CHANGES)
+        # Every task passed QA, so the plan is worth reusing
+        await self.manager.record_success(objective)
         # Return combined result
         result_message = 'All tasks completed successfully.\n\n'
         result_message += 'Changelog:\n' + '\n'.join(changelog) + '\n\n'
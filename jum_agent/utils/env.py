@@ -2,11 +2,26 @@
 
 from __future__ import annotations
 
+import functools
 import os
 from pathlib import Path
 from typing import Optional
 
-from dotenv import load_dotenv
+
+@functools.lru_cache(maxsize=8)
+def _find_env(cwd: str) -> Optional[Path]:
+    '''Return the nearest .env file in `cwd` or its parents, if any.
+
+    The result is memoised per working directory so repeated calls to
+    `load_env` do not walk the directory tree again.
+    '''
+    current = Path(cwd)
+    for parent in [current] + list(current.parents):
+        candidate = parent / '.env'
+        if candidate.exists():
+            return candidate
+    return None
+
 
 def load_env(env_file: Optional[str] = None) -> None:
     '''Load environment variables from a .env file.
@@ -15,14 +30,14 @@ def load_env(env_file: Optional[str] = None) -> None:
         provided, the function searches for a .env file in the current
         working directory and its parents.
     '''
+    # Imported lazily to keep CLI start-up fast
+    from dotenv import load_dotenv
+
     if env_file:
         load_dotenv(dotenv_path=env_file, override=False)
         return
     # Walk up the directory tree to find a .env file
-    current = Path.cwd()
-    for parent in [current] + list(current.parents):
-        candidate = parent / '.env'
-        if candidate.exists():
-            load_dotenv(dotenv_path=candidate, override=False)
-            return
+    candidate = _find_env(str(Path.cwd()))
+    if candidate is not None:
+        load_dotenv(dotenv_path=candidate, override=False)
     # No .env found; do nothing
@@ -0,0 +1,35 @@
+'''JSON helpers that use orjson when it is installed.
+
+orjson parses and serialises several times faster than the standard library
+and works on bytes directly, which avoids an extra decode/encode step when
+handling HTTP bodies and log files. When it is not installed these helpers
+fall back to the `json` module with the same signatures.
+'''
+
+from __future__ import annotations
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # type: ignore
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so either can be
+# caught by callers.
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(obj: Any) -> bytes:
+    '''Serialise `obj` to UTF-8 encoded JSON bytes.'''
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    '''Parse JSON from bytes or text.'''
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -5,37 +5,91 @@ JSON files. Each agent can append its actions to a log file, which is
 rotated daily. In a production system you might use Redis and a vector
 database for retrieval, but this simple implementation suffices for a
 self-contained demo.
+
+Log files are kept open between writes: each agent holds one line-buffered
+handle for its current log file, which is swapped when the day rolls over
+and closed at interpreter exit.
 '''
 
 from __future__ import annotations
 
-import json
+import atexit
 import os
-from datetime import datetime
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from . import fastjson
+
+# Log directory, resolved and created on first use.
+_LOG_DIR: Optional[Path] = None
+# Open log handles per agent, together with the file they point at.
+_handles: Dict[str, Tuple[Path, TextIO]] = {}
+# UTC day number and its formatted date, refreshed when the day changes.
+_date_cache: Tuple[int, str] = (-1, '')
+# Resolved log file per (agent_id, date).
+_path_cache: Dict[Tuple[str, str], Path] = {}
 
 
 def get_log_dir() -> Path:
-    '''Return the base directory for logs, creating it if necessary.'''
-    log_dir = os.environ.get('LOG_DIR', 'logs/agents')
-    path = Path(log_dir)
-    path.mkdir(parents=True, exist_ok=True)
-    return path
+    '''Return the base directory for logs, creating it if necessary.
+
+    LOG_DIR is read and the directory created once per process.
+    '''
+    global _LOG_DIR
+    if _LOG_DIR is None:
+        path = Path(os.environ.get('LOG_DIR', 'logs/agents'))
+        path.mkdir(parents=True, exist_ok=True)
+        _LOG_DIR = path
+    return _LOG_DIR
+
+
+def _utc_date() -> str:
+    '''Return today’s UTC date as YYYY-MM-DD, formatting it once per day.'''
+    global _date_cache
+    day = int(time.time() // 86400)
+    if day != _date_cache[0]:
+        _date_cache = (day, time.strftime('%Y-%m-%d', time.gmtime(day * 86400)))
+        _path_cache.clear()
+    return _date_cache[1]
 
 
 def _get_log_file(agent_id: str) -> Path:
     '''Return the path to the log file for the current day and agent.'''
-    date_str = datetime.utcnow().strftime('%Y-%m-%d')
-    return get_log_dir() / f'{agent_id}_{date_str}.jsonl'
+    date_str = _utc_date()
+    path = _path_cache.get((agent_id, date_str))
+    if path is None:
+        path = get_log_dir() / f'{agent_id}_{date_str}.jsonl'
+        _path_cache[(agent_id, date_str)] = path
+    return path
+
+
+def _get_handle(agent_id: str) -> TextIO:
+    '''Return an open append handle for the agent’s current log file.'''
+    log_file = _get_log_file(agent_id)
+    entry = _handles.get(agent_id)
+    if entry is not None and entry[0] == log_file:
+        return entry[1]
+    if entry is not None:
+        entry[1].close()
+    f = log_file.open('a', buffering=1, encoding='utf-8')
+    _handles[agent_id] = (log_file, f)
+    return f
+
+
+def _close_all() -> None:
+    '''Close every open log handle.'''
+    for _, f in _handles.values():
+        f.close()
+    _handles.clear()
+
+
+atexit.register(_close_all)
 
 
 def append_log(agent_id: str, record: Dict[str, Any]) -> None:
     '''Append a JSON record to the agent’s log file.'''
-    log_file = _get_log_file(agent_id)
-    with log_file.open('a', encoding='utf-8') as f:
-        json.dump(record, f, ensure_ascii=False)
-        f.write('\n')
+    _get_handle(agent_id).write(fastjson.dumps(record).decode('utf-8') + '\n')
 
 
 def read_logs(agent_id: str) -> List[Dict[str, Any]]:
@@ -44,10 +98,11 @@ def read_logs(agent_id: str) -> List[Dict[str, Any]]:
     if not log_file.exists():
         return []
     records: List[Dict[str, Any]] = []
-    with log_file.open('r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                records.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
+    for line in log_file.read_bytes().split(b'\n'):
+        if not line:
+            continue
+        try:
+            records.append(fastjson.loads(line))
+        except fastjson.JSONDecodeError:
+            continue
     return records